@@ -0,0 +1,187 @@
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from datetime import date, timedelta
+
+dataset_path = 'results/'
+TIMEFRAME_DAYS = {'Week': 7, 'Month': 30, 'Quarter': 90}
+NOT_RELATED = ('Not-related content', 'Not-related content.')
+
+default_image_path = 'logos/Default-Logo.png'
+image_paths = {
+    'Federal Home Loan Bank of San Francisco': 'logos/Federal-Home-Loan-Bank-Logo.png',
+    'Fannie Mae': 'logos/Fannie-Mae-Logo.png',
+    'First Republic Bank': 'logos/First-Republic-Bank-Logo.png',
+}
+
+
+def load_articles(topic):
+    """Load the processed articles of a topic without unrelated content.
+
+    Args:
+        topic (str): The member to load.
+
+    Returns:
+        pd.DataFrame: The articles of results/{topic}.csv.
+    """
+    data = pd.read_csv(f'{dataset_path}{topic}.csv')
+    return data[~data['summaries'].isin(NOT_RELATED)]
+
+
+def aggregate_daily(data, days):
+    """Daily mean sentiment and article count for the last `days` days.
+
+    Args:
+        data (pd.DataFrame): Articles with 'publish_date' and 'default_sentiment'.
+        days (int): Length of the window ending today.
+
+    Returns:
+        pd.DataFrame: Indexed by date with 'average_sentiment' and
+        'count_per_day' columns, missing days filled with 0.
+    """
+    data = data.assign(publish_date=pd.to_datetime(data['publish_date']).dt.date)
+    daily_summary = data.groupby('publish_date').agg({
+        'default_sentiment': 'mean',  # Average sentiment per day
+        'title': 'count'  # Count of entries per day, assuming 'title' as a proxy for entries
+    }).rename(columns={'default_sentiment': 'average_sentiment', 'title': 'count_per_day'})
+
+    end_date = date.today()
+    date_range = [end_date - timedelta(days=i) for i in range(days - 1, -1, -1)]
+    return daily_summary.reindex(date_range).fillna({
+        'average_sentiment': 0,  # Fill missing sentiment averages with 0
+        'count_per_day': 0       # Fill missing counts with 0
+    })
+
+
+def split_bullets(text):
+    """Split an LLM bullet list from bullets.csv into sentences."""
+    if not isinstance(text, str):
+        return []
+    return [sentence.strip('- ').strip() for sentence in text.split('\n') if sentence]
+
+
+def describe_sentiment(average_sentiment):
+    """Map an average sentiment percentage onto its label."""
+    if -10 <= average_sentiment <= 10:
+        return "Neutral"
+    elif -30 <= average_sentiment < -10:
+        return "Slightly Negative"
+    elif -60 <= average_sentiment < -30:
+        return "Moderately Negative"
+    elif average_sentiment < -60:
+        return "Very Negative"
+    elif 10 < average_sentiment <= 30:
+        return "Slightly Positive"
+    elif 30 < average_sentiment <= 60:
+        return "Moderately Positive"
+    elif average_sentiment > 60:
+        return "Very Positive"
+    return ""
+
+
+def build_view(topic, timeframe, bulletpoints, timeseries=None):
+    """Compute everything the Analysis tab shows for one member and timeframe.
+
+    Args:
+        topic (str): The member.
+        timeframe (str): 'Week', 'Month' or 'Quarter'.
+        bulletpoints (pd.DataFrame): The contents of results/bullets.csv.
+        timeseries (SentimentTimeSeries): Rolling statistics, used instead of
+        reading the CSV when the topic is present.
+
+    Returns:
+        dict: JSON-serializable view payload.
+    """
+    days = TIMEFRAME_DAYS[timeframe]
+    if timeseries is not None and topic in timeseries.topics:
+        # The state already holds the daily buckets, no need to read the CSV
+        daily = timeseries.daily_summary(topic, days)
+        anomalies = timeseries.anomalies(topic, since=(date.today() - timedelta(days=days)).isoformat())
+        articles_in_period = int(daily['count_per_day'].sum())
+    else:
+        data = load_articles(topic)
+        daily = aggregate_daily(data, days)
+        anomalies = []
+        published = pd.to_datetime(data['published date']).dt.date
+        articles_in_period = int((published > date.today() - timedelta(days=days)).sum())
+
+    average_sentiment = float(daily['average_sentiment'].mean() * 100)
+
+    topic_bullets = bulletpoints[(bulletpoints['topic'] == topic) & (bulletpoints['timeframe'] == f'{timeframe}ly')]
+    positive = split_bullets(topic_bullets['positive'].iloc[0]) if len(topic_bullets) else []
+    negative = split_bullets(topic_bullets['negative'].iloc[0]) if len(topic_bullets) else []
+
+    return {
+        'topic': topic,
+        'timeframe': timeframe,
+        'generated_on': date.today().isoformat(),
+        'daily': {
+            'date': [str(day) for day in daily.index],
+            'average_sentiment': [float(value) for value in daily['average_sentiment']],
+            'count_per_day': [int(value) for value in daily['count_per_day']],
+        },
+        'articles_in_period': articles_in_period,
+        'average_sentiment': average_sentiment,
+        'sentiment_text': describe_sentiment(average_sentiment),
+        'positive': positive,
+        'negative': negative,
+        'anomalies': anomalies,
+    }
+
+
+def build_figures(view):
+    """Create the article count, sentiment and gauge figures of a view payload.
+
+    Returns:
+        tuple: (article_count_plot, sentiment_plot, gauge) Plotly figures.
+    """
+    timeframe = view['timeframe']
+    daily = pd.DataFrame({'average_sentiment': view['daily']['average_sentiment'],
+                          'count_per_day': view['daily']['count_per_day']},
+                         index=pd.to_datetime(view['daily']['date']))
+
+    article_count_plot = px.line(daily, y='count_per_day', labels={'index': 'Date', 'count_per_day': 'Article Count'},
+                                 title=f'Number of Articles per {timeframe}')
+    article_count_plot.update_layout(xaxis_title='Date', yaxis_title='Number of Articles', plot_bgcolor='#F4F6F9', paper_bgcolor='#F4F6F9')
+    article_count_plot.update_layout(title={'x':0.5, 'xanchor': 'center'})
+
+    sentiment_plot = px.line(daily, y='average_sentiment', labels={'index': 'Date', 'average_sentiment': 'Average Sentiment'},
+                             title=f'Sentiment over {timeframe}')
+    sentiment_plot.update_layout(xaxis_title='Date', yaxis_title='Sentiment Score', plot_bgcolor='#F4F6F9', paper_bgcolor='#F4F6F9')
+    sentiment_plot.update_layout(title={'x':0.5, 'xanchor': 'center'})
+    sentiment_plot.update_traces(line_color='#FF5733')
+
+    gauge = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=view['average_sentiment'],
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Average Sentiment"},
+        gauge={
+            'axis': {'range': [-100, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
+            'bar': {'color': 'rgb(128, 122, 0)', 'thickness': 0.75},
+            'bgcolor': "#F4F6F9",
+            'borderwidth': 2,
+            'bordercolor': "gray",
+            'steps': [
+                {'range': [-100, -50], 'color': 'rgb(255, 0, 0)'},
+                {'range': [-50, 50], 'color': 'rgb(255, 255, 255)'},
+                {'range': [50, 100], 'color': 'rgb(60, 255, 0)'}
+            ],
+        }
+    ))
+
+    # Add the sentiment text in the middle of the gauge
+    gauge.update_layout(
+        annotations=[
+            dict(
+                text=view['sentiment_text'],
+                x=0.5,
+                y=0.5,
+                font=dict(size=24),
+                showarrow=False,
+                align="center"
+            )
+        ]
+    )
+    gauge.update_layout(plot_bgcolor="#F0F2F6", paper_bgcolor="#F0F2F6")
+    return article_count_plot, sentiment_plot, gauge
@@ -102,32 +102,45 @@ def get_google_news(topic, old_titles, start_date):
     return data
 
 
+def process_topic(topic):
+    """
+    Download new articles for a topic and stage them for the model.
+
+    Args:
+        topic (str): Topic for searching news articles.
+    """
+    start_date = date.today() - timedelta(days=2)
+    # start_date = (start_date.year, start_date.month, start_date.day)
+    filename = f'news/{topic}.csv'
+    if os.path.exists(filename):
+        old_df = pd.read_csv(filename)
+        old_titles = old_df['title'].values
+        old_df = pd.read_csv(filename)
+        df = pd.DataFrame(get_google_news(topic,
+                                          old_titles,
+                                          start_date), columns=old_df.columns)
+        merged_df = pd.concat([old_df, df], ignore_index=True)
+        merged_df.to_csv(filename, index=False)
+    else:
+        #old_df = pd.read_csv('news/First Republic Bank.csv', nrows=5)
+        df = pd.DataFrame(
+            get_google_news(topic, [], start_date=start_date),
+            columns=[ 'title', 'description', 'published date', 'url', 'publisher', 'content', 'image', 'publish_date', 'default_sentiment', 'entities', 'is_present'])
+    df['is_present'] = df['content'].str.lower().str.contains(topic.lower())
+    df = df[df['is_present']==True]
+    df.reset_index(inplace=True)
+    df.drop(columns='index', inplace=True)
+    to_filename = f'intermediate/{topic}.csv'
+    # A fresh staged file supersedes the marker left by the last model run
+    if os.path.exists(f'intermediate/processed/{topic}.csv'):
+        os.remove(f'intermediate/processed/{topic}.csv')
+    df.to_csv(to_filename, index=False)
+    df.to_csv(filename, index=False)
+
+
 if __name__ == '__main__':
     with open('topics.txt', 'r') as f:
         for line in f.readlines():
             topic = line.strip()
             print(topic)
-            start_date = date.today() - timedelta(days=2)
-            # start_date = (start_date.year, start_date.month, start_date.day)
-            filename = f'news/{topic}.csv'
-            if os.path.exists(filename):
-                old_df = pd.read_csv(filename)
-                old_titles = old_df['title'].values
-                old_df = pd.read_csv(filename)
-                df = pd.DataFrame(get_google_news(topic,
-                                                  old_titles,
-                                                  start_date), columns=old_df.columns)
-                merged_df = pd.concat([old_df, df], ignore_index=True)
-                merged_df.to_csv(filename, index=False)
-            else:
-                #old_df = pd.read_csv('news/First Republic Bank.csv', nrows=5)
-                df = pd.DataFrame(
-                    get_google_news(topic, [], start_date=start_date),
-                    columns=[ 'title', 'description', 'published date', 'url', 'publisher', 'content', 'image', 'publish_date', 'default_sentiment', 'entities', 'is_present'])
-            df['is_present'] = df['content'].str.lower().str.contains(topic.lower())
-            df = df[df['is_present']==True]
-            df.reset_index(inplace=True)
-            df.drop(columns='index', inplace=True)
-            to_filename = f'intermediate/{topic}.csv'
-            df.to_csv(to_filename, index=False)
-            df.to_csv(filename, index=False)
+            process_topic(topic)
@@ -0,0 +1,201 @@
+import os
+import json
+import html
+import base64
+import argparse
+from urllib.parse import quote
+import pandas as pd
+from datetime import date
+from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dashboard_views import (TIMEFRAME_DAYS, dataset_path, default_image_path,
+                             image_paths, build_view, build_figures)
+from sentiment_timeseries import SentimentTimeSeries
+
+SNAPSHOT_DIR = 'snapshots'
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{topic} - {timeframe}</title>
+<style>
+body {{ font-family: sans-serif; background: #F4F6F9; margin: 20px; }}
+h1 {{ text-align: center; color: #005A8D; }}
+.row {{ display: flex; gap: 20px; }}
+.col {{ flex: 1; min-width: 0; }}
+.positive li {{ color: #006E8D; }}
+.negative li {{ color: #FF5733; }}
+.count {{ color: #005A8D; font-size: 18px; text-align: center; }}
+.anomaly {{ background: #FFF3CD; padding: 8px; margin-bottom: 8px; }}
+img {{ width: 100%; }}
+</style>
+</head>
+<body>
+<h1>Member Analysis</h1>
+<p style="text-align: center;">{topic} &middot; {timeframe} &middot; generated on {generated_on}</p>
+{anomalies}
+<div class="row">
+<div class="col">{article_count_plot}<h3>Positive News</h3><ul class="positive">{positive}</ul></div>
+<div class="col">{sentiment_plot}<h3>Negative News</h3><ul class="negative">{negative}</ul></div>
+<div class="col">{logo}<p class="count">Number of news articles released this {timeframe}: {articles_in_period}</p>{gauge}</div>
+</div>
+</body>
+</html>
+"""
+
+
+def snapshot_path(topic, timeframe, extension, snapshot_dir=SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, topic, f'{timeframe}.{extension}')
+
+
+def load_snapshot(topic, timeframe, snapshot_dir=SNAPSHOT_DIR):
+    """Return today's pre-computed view payload, or None if there is none.
+
+    Args:
+        topic (str): The member.
+        timeframe (str): 'Week', 'Month' or 'Quarter'.
+        snapshot_dir (str): Directory the snapshots were exported to.
+
+    Returns:
+        dict: The payload written by `export_view`.
+    """
+    path = snapshot_path(topic, timeframe, 'json', snapshot_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        view = json.load(f)
+    # Views are relative to the current day and to the data they were built
+    # from, stale ones are recomputed live
+    if view['generated_on'] != date.today().isoformat() or \
+            view.get('source_mtimes') != source_mtimes(topic):
+        return None
+    return view
+
+
+def file_mtimes(paths):
+    return {path: os.path.getmtime(path) if os.path.exists(path) else None
+            for path in paths}
+
+
+# Files every view is built from, besides the member's own results CSV
+SHARED_SOURCES = [f'{dataset_path}bullets.csv', f'{dataset_path}timeseries_state.json']
+
+
+def source_mtimes(topic):
+    """Modification times of the files a view of `topic` is built from."""
+    return file_mtimes([f'{dataset_path}{topic}.csv'] + SHARED_SOURCES)
+
+
+def logo_html(topic):
+    """Inline the member logo so the page has no external files."""
+    image_path = image_paths.get(topic, default_image_path)
+    if not os.path.exists(image_path):
+        return ''
+    with open(image_path, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode('ascii')
+    return f'<img src="data:image/png;base64,{encoded}">'
+
+
+def render_page(view, include_plotlyjs=True):
+    """Render a view payload as a standalone HTML page.
+
+    Args:
+        view (dict): Payload from `build_view`.
+        include_plotlyjs (bool or str): True to inline plotly.js, 'cdn' to link it.
+
+    Returns:
+        str: The HTML document.
+    """
+    article_count_plot, sentiment_plot, gauge = build_figures(view)
+    anomalies = ''.join(
+        f"<div class=\"anomaly\">{html.escape(a['kind'].replace('_', ' ').capitalize())} on {a['date']}: "
+        f"{a['value']} vs baseline {a['baseline']}</div>" for a in view['anomalies'])
+    return PAGE_TEMPLATE.format(
+        topic=html.escape(view['topic']),
+        timeframe=view['timeframe'],
+        generated_on=view['generated_on'],
+        anomalies=anomalies,
+        # plotly.js is only needed once per page
+        article_count_plot=article_count_plot.to_html(full_html=False, include_plotlyjs=include_plotlyjs),
+        sentiment_plot=sentiment_plot.to_html(full_html=False, include_plotlyjs=False),
+        gauge=gauge.to_html(full_html=False, include_plotlyjs=False),
+        positive=''.join(f'<li>{html.escape(s)}</li>' for s in view['positive']),
+        negative=''.join(f'<li>{html.escape(s)}</li>' for s in view['negative']),
+        logo=logo_html(view['topic']),
+        articles_in_period=view['articles_in_period'])
+
+
+# Loaded once per worker process by `init_worker`
+_bulletpoints = None
+_timeseries = None
+_loaded_mtimes = {}
+
+
+def init_worker():
+    global _bulletpoints, _timeseries, _loaded_mtimes
+    # Taken before reading, so an update while loading marks the views stale
+    _loaded_mtimes = file_mtimes(SHARED_SOURCES)
+    _bulletpoints = pd.read_csv(f'{dataset_path}bullets.csv')
+    _timeseries = SentimentTimeSeries(f'{dataset_path}timeseries_state.json')
+
+
+def export_view(topic, timeframe, snapshot_dir=SNAPSHOT_DIR, include_plotlyjs=True):
+    """Write the JSON payload and the HTML page of one member and timeframe."""
+    # The topic CSV is read below, the shared files were read by init_worker
+    mtimes = {**source_mtimes(topic), **_loaded_mtimes}
+    view = build_view(topic, timeframe, _bulletpoints, _timeseries)
+    view['source_mtimes'] = mtimes
+    os.makedirs(os.path.join(snapshot_dir, topic), exist_ok=True)
+    # Write to a temporary file first so readers never see a partial snapshot
+    for extension, content in (('json', json.dumps(view)),
+                               ('html', render_page(view, include_plotlyjs))):
+        path = snapshot_path(topic, timeframe, extension, snapshot_dir)
+        with open(path + '.tmp', 'w') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+    return topic, timeframe
+
+
+def write_index(views, snapshot_dir=SNAPSHOT_DIR):
+    """Write an index page linking every exported view."""
+    links = ''.join(
+        f'<li><a href="{quote(topic)}/{timeframe}.html">{html.escape(topic)} - {timeframe}</a></li>'
+        for topic, timeframe in sorted(views))
+    with open(os.path.join(snapshot_dir, 'index.html'), 'w') as f:
+        f.write(f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Member Analysis</title></head>'
+                f'<body><h1>Member Analysis</h1><ul>{links}</ul></body></html>')
+
+
+def export_all(snapshot_dir=SNAPSHOT_DIR, workers=None, include_plotlyjs=True):
+    """Export every member and timeframe in parallel worker processes.
+
+    Run it after the bullets and the time-series state have been written,
+    i.e. after report_generation.py or a `worker.py work` run.
+
+    Returns:
+        list: The exported (topic, timeframe) pairs.
+    """
+    topics = pd.read_csv(f'{dataset_path}bullets.csv')['topic'].unique()
+    views = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [executor.submit(export_view, topic, timeframe, snapshot_dir, include_plotlyjs)
+                   for topic in topics for timeframe in TIMEFRAME_DAYS]
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            try:
+                views.append(future.result())
+            except Exception as e:
+                print('Could not export view:', e)
+    write_index(views, snapshot_dir)
+    print(f'{len(views)} views exported to {snapshot_dir}')
+    return views
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pre-render the dashboard for every member and timeframe.')
+    parser.add_argument('--output', default=SNAPSHOT_DIR)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--plotlyjs', choices=['inline', 'cdn'], default='inline',
+                        help='Inline plotly.js in every page or load it from the CDN')
+    args = parser.parse_args()
+    export_all(args.output, args.workers, True if args.plotlyjs == 'inline' else 'cdn')
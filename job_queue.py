@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+
+QUEUE_PATH = 'intermediate/jobs.sqlite'
+STAGES = ('download', 'model', 'report')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    stage_index INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    ready_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (run_id, topic, stage)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, stage);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    stage_caps TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL
+);
+"""
+
+
+class JobQueue:
+    """Lease-based queue with one job per (run, topic, stage), stored in SQLite.
+
+    A job becomes claimable once the previous stage of the same topic is done.
+    Claimed jobs are leased to a worker and must be heartbeated; a job whose
+    lease expires is handed to another worker and counts as an attempt.
+    Per-stage concurrency caps are stored with the run, so every worker
+    enforces the same limits.
+
+    Several processes, or hosts sharing the file, can use the same store.
+    SQLite locking and the fcntl lock on the time-series state are not
+    reliable on NFS-style network filesystems, so hosts should share a
+    filesystem with working POSIX locks (e.g. a cluster filesystem or a
+    single host's disk exported to containers), not a plain NFS mount.
+    """
+
+    def __init__(self, path=QUEUE_PATH, lease_seconds=600, max_attempts=3,
+                 retry_delay=60):
+        """
+        Args:
+            path (str): Location of the SQLite database.
+            lease_seconds (int): How long a claim is valid without a heartbeat.
+            max_attempts (int): Attempts before a job is marked failed.
+            retry_delay (int): Seconds to wait before retrying, multiplied by the attempt count.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.executescript(SCHEMA)
+            # Stores created before ready_at existed
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(jobs)')]
+            if 'ready_at' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN ready_at REAL NOT NULL DEFAULT 0')
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Yield a connection inside a write-locked transaction, then close it."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def enqueue_run(self, topics, run_id=None, stages=STAGES, stage_caps=None):
+        """Create one job per topic and stage for a new run.
+
+        Args:
+            topics (list): Topics to process.
+            run_id (str): Identifier of the run, defaults to today's date.
+            stages (tuple): Stages to run for each topic, in order.
+            stage_caps (dict): Maximum number of concurrently leased jobs per
+            stage, shared by every worker of the run.
+
+        Returns:
+            str: The run identifier.
+        """
+        run_id = run_id or time.strftime('%Y-%m-%d')
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO runs (run_id, stage_caps, created_at) VALUES (?, ?, ?)',
+                (run_id, json.dumps(stage_caps or {}), now))
+            conn.executemany(
+                'INSERT OR IGNORE INTO jobs (run_id, topic, stage, stage_index, ready_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, topic, stage, index, now, now, now)
+                 for topic in topics for index, stage in enumerate(stages)])
+        return run_id
+
+    def claim(self, worker_id, run_id, stages=None):
+        """Lease the next runnable job of a run to a worker.
+
+        Jobs that were retried least are served first, then the job that has
+        been ready the longest, i.e. since its previous stage finished. Topics
+        therefore advance breadth first and no topic starves. Stages that
+        have reached the run's concurrency cap are skipped, and a topic is
+        never leased twice at once, even across runs, since its stages share
+        files.
+
+        Args:
+            worker_id (str): Identifier of the claiming worker.
+            run_id (str): Only claim jobs of this run.
+            stages (list): Only claim jobs of these stages; all when None.
+
+        Returns:
+            dict: The claimed job, or None if nothing is runnable right now.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            # Jobs whose lease expired too often are given up
+            conn.execute(
+                "UPDATE jobs SET state = 'failed', worker_id = NULL, updated_at = ?, "
+                "last_error = COALESCE(last_error, 'lease expired') "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts))
+            running = dict(conn.execute(
+                "SELECT stage, COUNT(*) FROM jobs WHERE state = 'leased' AND lease_expires >= ? "
+                "GROUP BY stage", (now,)).fetchall())
+            caps = conn.execute('SELECT stage_caps FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+            caps = json.loads(caps[0]) if caps else {}
+            allowed = [stage for stage in (stages or STAGES)
+                       if running.get(stage, 0) < caps.get(stage, float('inf'))]
+            if not allowed:
+                return None
+            row = conn.execute(
+                "SELECT * FROM jobs AS j "
+                "WHERE j.run_id = ? "
+                "AND (j.state = 'pending' OR (j.state = 'leased' AND j.lease_expires < ?)) "
+                "AND j.available_at <= ? "
+                "AND j.stage IN ({}) "
+                "AND (j.stage_index = 0 OR EXISTS (SELECT 1 FROM jobs AS p WHERE p.run_id = j.run_id "
+                "AND p.topic = j.topic AND p.stage_index = j.stage_index - 1 AND p.state = 'done')) "
+                "AND NOT EXISTS (SELECT 1 FROM jobs AS o WHERE o.topic = j.topic AND o.id != j.id "
+                "AND o.state = 'leased' AND o.lease_expires >= ?) "
+                "ORDER BY j.attempts, j.ready_at, j.id LIMIT 1".format(
+                    ', '.join('?' * len(allowed))),
+                [run_id, now, now] + allowed + [now]).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET state = 'leased', worker_id = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row['id']))
+        job = dict(row)
+        job['attempts'] += 1
+        return job
+
+    def heartbeat(self, job_id, worker_id):
+        """Extend a lease. Returns False if the worker no longer holds it."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND worker_id = ? AND state = 'leased'",
+                (now + self.lease_seconds, now, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id):
+        """Mark a leased job as done and its topic's next stage as ready."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET state = 'done', lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND worker_id = ? AND state = 'leased'",
+                (now, job_id, worker_id))
+            if cursor.rowcount == 1:
+                conn.execute(
+                    "UPDATE jobs SET ready_at = ? WHERE id IN (SELECT n.id FROM jobs AS n, jobs AS d "
+                    "WHERE d.id = ? AND n.run_id = d.run_id AND n.topic = d.topic "
+                    "AND n.stage_index = d.stage_index + 1)",
+                    (now, job_id))
+
+    def fail(self, job_id, worker_id, error):
+        """Release a leased job for a delayed retry, or fail it after max_attempts."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker_id = NULL, lease_expires = NULL, available_at = ? + attempts * ?, "
+                "last_error = ?, updated_at = ? "
+                "WHERE id = ? AND worker_id = ? AND state = 'leased'",
+                (self.max_attempts, now, self.retry_delay, str(error), now, job_id, worker_id))
+
+    def run_status(self, run_id):
+        """Count the jobs of a run per state.
+
+        Returns:
+            dict: State name mapped to the number of jobs in it.
+        """
+        with self._transaction() as conn:
+            return dict(conn.execute(
+                'SELECT state, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY state',
+                (run_id,)).fetchall())
+
+    def topics_in_state(self, run_id, stage, state='done'):
+        """List the topics whose job of a stage is in the given state."""
+        with self._transaction() as conn:
+            return [row[0] for row in conn.execute(
+                'SELECT topic FROM jobs WHERE run_id = ? AND stage = ? AND state = ? ORDER BY id',
+                (run_id, stage, state)).fetchall()]
+
+    def is_finished(self, run_id):
+        """Whether no job of the run can make progress anymore.
+
+        Raises:
+            ValueError: If the run was never enqueued.
+        """
+        with self._transaction() as conn:
+            if conn.execute('SELECT 1 FROM jobs WHERE run_id = ? LIMIT 1', (run_id,)).fetchone() is None:
+                raise ValueError(f'Unknown run {run_id}, enqueue it first')
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs AS j WHERE j.run_id = ? "
+                "AND j.state IN ('pending', 'leased') "
+                "AND NOT EXISTS (SELECT 1 FROM jobs AS p WHERE p.run_id = j.run_id "
+                "AND p.topic = j.topic AND p.stage_index < j.stage_index AND p.state = 'failed')",
+                (run_id,)).fetchone()[0]
+        return pending == 0
@@ -8,6 +8,7 @@ from langchain_core.prompts.prompt import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts.few_shot import FewShotPromptTemplate
+from sentiment_timeseries import SentimentTimeSeries
 
 def create_sentiment_classification_prompt(content, topic):
     """Create a sentiment classification prompt based on the given topic.
@@ -72,6 +73,75 @@ def create_summarization_prompt(content, topic):
     return summarization_prompt
 
 
+def process_topic(topic, llm, output_parser, examples, timeseries):
+    """Classify and summarize the staged articles of a topic and merge them into results/.
+
+    Running it again on the same staged file is safe. Once done, the staged
+    file is moved to intermediate/processed/ so a retry can tell the topic
+    was already processed.
+
+    Args:
+        topic (str): The topic whose intermediate file is processed.
+        llm: The chat model used for classification and summarization.
+        output_parser (StrOutputParser): Parser applied to the model output.
+        examples (list): Few-shot examples for sentiment classification.
+        timeseries (SentimentTimeSeries): Rolling statistics updated with the new rows.
+
+    Returns:
+        bool: False if no staged data was found for the topic.
+    """
+    try:
+        data = pd.read_csv(f'intermediate/{topic}.csv')
+    except FileNotFoundError as e:
+        print('No new data found for', topic)
+        return False
+    # Rows already saved by an earlier attempt that crashed before removing
+    # the staged file are not classified again, only folded into the state
+    old_file_path = f'results/{topic}.csv'
+    old_data = pd.read_csv(old_file_path) if os.path.exists(old_file_path) else data.iloc[:0]
+    saved_data = old_data[old_data['url'].isin(data['url'])]
+    data = data[~data['url'].isin(old_data['url'])].copy()
+    texts = data['content'].values
+    sentiments = []
+    
+    for i in tqdm(range(len(texts))):
+        try:
+            # sentiment_prompt = create_sentiment_classification_prompt(texts[i], topic)
+            # sentiment_chain = sentiment_prompt | llm | output_parser
+            prompt = create_few_shot_sentiment_classification_prompt(examples)
+            sentiment_chain = prompt | llm | output_parser
+            sentiments.append(sentiment_chain.invoke({"topic": topic, "content": texts[i]}))
+        except:
+            sentiments.append('Neutral')
+    
+    data['text sentiment'] = sentiments
+
+    summaries = []
+    for ind, row in tqdm(data.iterrows()):
+        try:
+            summarization_prompt = create_summarization_prompt(row['content'], topic)
+            summarizer_chain = summarization_prompt | llm | output_parser
+            summaries.append(summarizer_chain.invoke({"topic": topic, "content": row['content']}))
+        except Exception as e:
+            summaries.append('Not-related content')
+    
+    data['summaries'] = summaries
+    new_data = pd.concat([saved_data, data])
+
+    data = pd.concat([old_data, data])
+    data = data.drop_duplicates()
+    data.to_csv(old_file_path, index=False)
+    print(f'Data and results for {topic} are saved')
+
+    # Only fold rows into the rolling statistics once they are safely saved,
+    # and persist them before the staged file is gone
+    timeseries.sync(topic, new_data, old_file_path)
+    timeseries.save(topics=[topic])
+    os.makedirs('intermediate/processed', exist_ok=True)
+    os.replace(f'intermediate/{topic}.csv', f'intermediate/processed/{topic}.csv')
+    return True
+
+
 if __name__ == '__main__':
     with open('gemini_api_key.pickle', 'rb') as handle:
         gemini_api_key = pickle.load(handle)
@@ -88,46 +158,8 @@ if __name__ == '__main__':
     
     data = pd.read_csv('/Users/vineethguptha/github/reputation_monitoring_system/few_shots_sentiments.csv')
     examples = [{'question':row['content'], 'answer':row['label']} for index, row in data.iterrows()]
+    timeseries = SentimentTimeSeries(on_anomaly=lambda topic, anomaly: print('Anomaly detected for', topic, anomaly))
     
     for topic in topics:
-        try:
-            data = pd.read_csv(f'intermediate/{topic}.csv')
-        except FileNotFoundError as e:
-            print('No new data found for', topic)
+        if not process_topic(topic, llm, output_parser, examples, timeseries):
             break
-        texts = data['content'].values
-        sentiments = []
-        
-        for i in tqdm(range(len(texts))):
-            try:
-                # sentiment_prompt = create_sentiment_classification_prompt(texts[i], topic)
-                # sentiment_chain = sentiment_prompt | llm | output_parser
-                prompt = create_few_shot_sentiment_classification_prompt(examples)
-                sentiment_chain = prompt | llm | output_parser
-                sentiments.append(sentiment_chain.invoke({"topic": topic, "content": texts[i]}))
-            except:
-                sentiments.append('Neutral')
-        
-        data['text sentiment'] = sentiments
-
-        summaries = []
-        for ind, row in tqdm(data.iterrows()):
-            try:
-                summarization_prompt = create_summarization_prompt(row['content'], topic)
-                summarizer_chain = summarization_prompt | llm | output_parser
-                summaries.append(summarizer_chain.invoke({"topic": topic, "content": row['content']}))
-            except Exception as e:
-                summaries.append('Not-related content')
-        
-        data['summaries'] = summaries
-
-        # Check if the old data file exists
-        old_file_path = f'results/{topic}.csv'
-        if os.path.exists(old_file_path):
-            old_data = pd.read_csv(old_file_path)
-            
-            data = pd.concat([old_data, data])
-        data = data.drop_duplicates()
-        data.to_csv(old_file_path, index=False)
-        print(f'Data and results for {topic} are saved')
-        os.remove(f'intermediate/{topic}.csv')
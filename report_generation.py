@@ -10,6 +10,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS
 import pickle
+from dashboard_views import dataset_path
+from export_snapshots import export_all
 
 def create_positive_summarization_prompt(contents, topic):
     """ Create a summarization prompt based on the given content and topic.
@@ -35,6 +37,74 @@ def create_negative_summarization_prompt(contents, topic):
     summarization_prompt = ChatPromptTemplate.from_template(summarization_template)
     return summarization_prompt
 
+def get_date_filters():
+    """ Start dates of the week, month and quarter timeframes, counted back from today.
+    Returns:
+        dict: Timeframe name mapped to its start date.
+    """
+    today = date.today()
+    quarter_date = today - timedelta(days=120)
+    month_date = today - timedelta(days=30)
+    week_date = today - timedelta(days=7)
+    return {"Weekly": week_date, "Monthly": month_date, "Quarterly": quarter_date}
+
+def generate_bullets(topic, llm, output_parser, date_filters):
+    """ Summarize the positive and negative news of a topic for every timeframe.
+    Args:
+        topic (str): The topic for which the bullets are created.
+        llm: The chat model used for summarization.
+        output_parser (StrOutputParser): Parser applied to the model output.
+        date_filters (dict): Timeframe name mapped to its start date.
+    Returns:
+        list: One row dict per timeframe with topic, timeframe, positive and negative bullets.
+    """
+    rows = []
+    data = pd.read_csv(f'results/{topic}.csv')
+    # Filter out unrelated content
+    data = data[data['summaries'] != 'Not-related content.']
+    data = data[data['summaries'] != 'Not-related content']
+    data.reset_index(inplace=True)
+    # Convert publish_date to datetime
+    data['publish_date'] = pd.to_datetime(data['published date']).dt.date
+    # Sort data by publish_date
+    data.sort_values('publish_date', ascending=False, inplace=True)
+    print(data)
+
+    for key, date in date_filters.items():
+        filtered_data_pos = data[(data['publish_date'] > date)&(data['text sentiment']=='Positive')]
+
+        # negative data
+        filtered_data_neg = data[(data['publish_date'] > date)&(data['text sentiment']=='Negative')]
+
+        print(topic, key, filtered_data_pos.shape, filtered_data_neg.shape)
+
+        contents = '----'.join(filtered_data_pos['summaries'].values)
+        urls = '----'.join(filtered_data_pos['url'].values)
+        summarization_prompt = create_positive_summarization_prompt(contents, topic)
+        summarizer_chain = summarization_prompt | llm | output_parser
+        pos_summaries = summarizer_chain.invoke(
+            {"topic": topic, "contents": contents})
+
+        # print(pos_summaries, '\n\n')
+
+        contents = '----'.join(filtered_data_neg['summaries'].values)
+        urls = '----'.join(filtered_data_neg['url'].values)
+        if len(filtered_data_neg['summaries'].values)>0:
+            summarization_prompt = create_negative_summarization_prompt(contents, topic)
+            summarizer_chain = summarization_prompt | llm | output_parser
+            neg_summaries = summarizer_chain.invoke(
+                {"topic": topic, "contents": contents})
+        else:
+            neg_summaries=''
+
+        # print(neg_summaries)
+
+        new_row = {'topic':topic, 'timeframe':key, 'positive':pos_summaries, 'negative':neg_summaries}
+        #print(pos_summaries, neg_summaries)
+        rows.append(new_row)
+    return rows
+
+
 if __name__ == '__main__':
     # Load gemini API key
     with open('/Users/vineethguptha/fhlbsf/gemini_api_key.pickle', 'rb') as handle:
@@ -46,59 +116,15 @@ if __name__ == '__main__':
 
     result = pd.DataFrame(columns=['Topic','Timeframe','Positive','Negative'])
 
-    # Define quarter, month, and week dates
-    today = date.today()
-    quarter_date = today - timedelta(days=120)
-    month_date = today - timedelta(days=30)
-    week_date = today - timedelta(days=7)
-    date_filters = {"Weekly": week_date, "Monthly": month_date, "Quarterly": quarter_date}
+    date_filters = get_date_filters()
 
     # Read topics from file
     with open('topics.txt', 'r') as f:
         topics = [line.strip() for line in f]
     result = pd.DataFrame(columns=['topic','timeframe','positive','negative'])
     for topic in tqdm(topics):
-        data = pd.read_csv(f'results/{topic}.csv')
-        # Filter out unrelated content
-        data = data[data['summaries'] != 'Not-related content.']
-        data = data[data['summaries'] != 'Not-related content']
-        data.reset_index(inplace=True)
-        # Convert publish_date to datetime
-        data['publish_date'] = pd.to_datetime(data['published date']).dt.date
-        # Sort data by publish_date
-        data.sort_values('publish_date', ascending=False, inplace=True)
-        print(data)
-
-        for key, date in date_filters.items():
-            filtered_data_pos = data[(data['publish_date'] > date)&(data['text sentiment']=='Positive')]
-
-            # negative data
-            filtered_data_neg = data[(data['publish_date'] > date)&(data['text sentiment']=='Negative')]
-
-            print(topic, key, filtered_data_pos.shape, filtered_data_neg.shape)
-
-            contents = '----'.join(filtered_data_pos['summaries'].values)
-            urls = '----'.join(filtered_data_pos['url'].values)
-            summarization_prompt = create_positive_summarization_prompt(contents, topic)
-            summarizer_chain = summarization_prompt | llm | output_parser
-            pos_summaries = summarizer_chain.invoke(
-                {"topic": topic, "contents": contents})
-
-            # print(pos_summaries, '\n\n')
-
-            contents = '----'.join(filtered_data_neg['summaries'].values)
-            urls = '----'.join(filtered_data_neg['url'].values)
-            if len(filtered_data_neg['summaries'].values)>0:
-                summarization_prompt = create_negative_summarization_prompt(contents, topic)
-                summarizer_chain = summarization_prompt | llm | output_parser
-                neg_summaries = summarizer_chain.invoke(
-                    {"topic": topic, "contents": contents})
-            else:
-                neg_summaries=''
-
-            # print(neg_summaries)
-
-            new_row = {'topic':topic, 'timeframe':key, 'positive':pos_summaries, 'negative':neg_summaries}
-            #print(pos_summaries, neg_summaries)
+        for new_row in generate_bullets(topic, llm, output_parser, date_filters):
             result.loc[len(result)] = new_row
-    result.to_csv('/Users/vineethguptha/github/reputation_monitoring_system/results/bullets.csv', index=False)
\ No newline at end of file
+    result.to_csv(f'{dataset_path}bullets.csv', index=False)
+    # Pre-render the dashboard views from the fresh bullets
+    export_all()
@@ -0,0 +1,325 @@
+import os
+import json
+import fcntl
+import math
+import pandas as pd
+from datetime import date, timedelta
+
+STATE_PATH = 'results/timeseries_state.json'
+NOT_RELATED = ('Not-related content', 'Not-related content.')
+LABELS = ('Positive', 'Negative', 'Neutral')
+
+
+def normalize_label(label):
+    """Map a raw LLM sentiment answer onto one of the known labels.
+
+    Args:
+        label (str): Value of the 'text sentiment' column.
+
+    Returns:
+        str: 'Positive', 'Negative', 'Neutral' or 'Other'.
+    """
+    if not isinstance(label, str):
+        return 'Other'
+    for known in LABELS:
+        if known.lower() in label.lower():
+            return known
+    return 'Other'
+
+
+class TopicSeries:
+    """Rolling daily statistics for a single topic.
+
+    Every day before the current one is folded into the EWMA baselines and
+    checked for anomalies once, so each new day costs O(1) regardless of how
+    much history exists. Articles arriving late for an already closed day are
+    added to its counts, but the baselines are not re-folded and the day is
+    not checked again. Only the last `window` days of per-day buckets are
+    retained, along with the keys of the articles in them to skip duplicates.
+    """
+
+    def __init__(self, alpha=0.2, window=120, warmup=7, z_threshold=3.0,
+                 neg_share_jump=0.25, min_count=3):
+        self.alpha = alpha
+        self.window = window
+        self.warmup = warmup
+        self.z_threshold = z_threshold
+        self.neg_share_jump = neg_share_jump
+        self.min_count = min_count
+        self.days = {}
+        self.seen = {}
+        self.total_count = 0
+        self.total_sentiment = 0.0
+        self.label_totals = {label: 0 for label in LABELS + ('Other',)}
+        self.last_closed = None
+        self.closed_days = 0
+        self.ewma = {'count': 0.0, 'count_var': 0.0, 'sentiment': 0.0,
+                     'sentiment_var': 0.0, 'neg_share': 0.0}
+        self.anomalies = []
+
+    def add(self, day, sentiment, label, key=None):
+        """Add one article to the bucket for `day` (an ISO date string).
+
+        Returns:
+            bool: False if an article with the same key was already added.
+        """
+        if key is not None:
+            if key in self.seen:
+                return False
+            self.seen[key] = day
+        bucket = self.days.setdefault(day, {'count': 0, 'sentiment_sum': 0.0,
+                                            'sentiment_n': 0, 'labels': {}})
+        bucket['count'] += 1
+        if sentiment is not None:
+            bucket['sentiment_sum'] += sentiment
+            bucket['sentiment_n'] += 1
+            self.total_sentiment += sentiment
+        label = normalize_label(label)
+        bucket['labels'][label] = bucket['labels'].get(label, 0) + 1
+        self.label_totals[label] = self.label_totals.get(label, 0) + 1
+        self.total_count += 1
+        return True
+
+    def close_until(self, day):
+        """Fold every complete day before `day` into the baselines.
+
+        Args:
+            day (str): ISO date of the current day; it stays open.
+
+        Returns:
+            list: Anomalies detected on the days that were closed.
+        """
+        end = date.fromisoformat(day)
+        if self.last_closed is None:
+            if not self.days:
+                return []
+            current = date.fromisoformat(min(self.days))
+        else:
+            current = date.fromisoformat(self.last_closed) + timedelta(days=1)
+        found = []
+        while current < end:
+            found.extend(self._close_day(current.isoformat()))
+            current += timedelta(days=1)
+        self._prune(end)
+        return found
+
+    def _close_day(self, day):
+        bucket = self.days.get(day, {'count': 0, 'sentiment_sum': 0.0,
+                                     'sentiment_n': 0, 'labels': {}})
+        count = bucket['count']
+        mean = (bucket['sentiment_sum'] / bucket['sentiment_n']
+                if bucket['sentiment_n'] else None)
+        neg_share = bucket['labels'].get('Negative', 0) / count if count else 0.0
+
+        found = []
+        if self.closed_days >= self.warmup and count >= self.min_count:
+            # Floors keep a perfectly flat history from flagging every wobble
+            # or, for sentiment, from never flagging anything
+            std = math.sqrt(self.ewma['count_var'])
+            if count > self.ewma['count'] + self.z_threshold * max(std, 1.0):
+                found.append(self._anomaly(day, 'volume_spike', count, self.ewma['count']))
+            if neg_share - self.ewma['neg_share'] >= self.neg_share_jump:
+                found.append(self._anomaly(day, 'negative_share_jump', neg_share,
+                                           self.ewma['neg_share']))
+            std = math.sqrt(self.ewma['sentiment_var'])
+            if mean is not None and \
+                    self.ewma['sentiment'] - mean > self.z_threshold * max(std, 0.05):
+                found.append(self._anomaly(day, 'sentiment_drop', mean,
+                                           self.ewma['sentiment']))
+
+        if self.closed_days == 0:
+            self.ewma['count'] = float(count)
+            self.ewma['neg_share'] = neg_share
+            if mean is not None:
+                self.ewma['sentiment'] = mean
+        else:
+            self._fold('count', count)
+            if count:
+                self.ewma['neg_share'] += self.alpha * (neg_share - self.ewma['neg_share'])
+            if mean is not None:
+                self._fold('sentiment', mean)
+        self.closed_days += 1
+        self.last_closed = day
+        self.anomalies.extend(found)
+        return found
+
+    def _fold(self, key, value):
+        diff = value - self.ewma[key]
+        increment = self.alpha * diff
+        self.ewma[key] += increment
+        self.ewma[key + '_var'] = (1 - self.alpha) * (self.ewma[key + '_var'] + diff * increment)
+
+    def _anomaly(self, day, kind, value, baseline):
+        return {'date': day, 'kind': kind, 'value': round(value, 4),
+                'baseline': round(baseline, 4)}
+
+    def _prune(self, end):
+        cutoff = (end - timedelta(days=self.window)).isoformat()
+        for day in [d for d in self.days if d < cutoff]:
+            del self.days[day]
+        self.seen = {key: day for key, day in self.seen.items() if day >= cutoff}
+        self.anomalies = [a for a in self.anomalies if a['date'] >= cutoff]
+
+    def daily_summary(self, days, end_date=None):
+        """Daily mean sentiment and article count for the last `days` days.
+
+        Returns:
+            pd.DataFrame: Indexed by date with 'average_sentiment' and
+            'count_per_day' columns, missing days filled with 0.
+        """
+        end_date = end_date or date.today()
+        date_range = [end_date - timedelta(days=i) for i in range(days - 1, -1, -1)]
+        rows = []
+        for day in date_range:
+            bucket = self.days.get(day.isoformat())
+            if bucket and bucket['sentiment_n']:
+                rows.append((bucket['sentiment_sum'] / bucket['sentiment_n'], bucket['count']))
+            elif bucket:
+                rows.append((0, bucket['count']))
+            else:
+                rows.append((0, 0))
+        return pd.DataFrame(rows, index=date_range,
+                            columns=['average_sentiment', 'count_per_day'])
+
+    def to_dict(self):
+        return {key: value for key, value in self.__dict__.items()}
+
+    @classmethod
+    def from_dict(cls, state):
+        series = cls()
+        series.__dict__.update(state)
+        return series
+
+
+class SentimentTimeSeries:
+    """Per-topic incremental time series, persisted as JSON between runs.
+
+    The pipeline calls `sync` with the rows it appends to results/,
+    the dashboard reads `daily_summary`, and alerting polls `anomalies`.
+    """
+
+    def __init__(self, path=STATE_PATH, on_anomaly=None):
+        self.path = path
+        self.on_anomaly = on_anomaly
+        self.topics = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            self.topics = {topic: TopicSeries.from_dict(series)
+                           for topic, series in state.items()}
+
+    def update(self, topic, data, today=None):
+        """Add newly processed articles for a topic and close the past days.
+
+        Rows without a parseable publish date, older than the retained window
+        or already added (same url) are skipped, so passing the same rows
+        twice is harmless.
+
+        Args:
+            topic (str): Topic the rows belong to.
+            data (pd.DataFrame): Rows with 'publish_date', 'default_sentiment',
+            'text sentiment' and 'summaries' columns.
+            today (date): Current day, every day before it is closed.
+
+        Returns:
+            list: Anomalies detected on days closed by this update.
+        """
+        today = today or date.today()
+        series = self.topics.setdefault(topic, TopicSeries())
+        data = data[~data['summaries'].isin(NOT_RELATED)]
+        days = pd.to_datetime(data['publish_date'].astype(str).str[:10], format='%Y-%m-%d', errors='coerce')
+        data = data.assign(day=days.dt.strftime('%Y-%m-%d'))[days.notna()]
+        cutoff = (today - timedelta(days=series.window)).isoformat()
+        keys = data['url'] if 'url' in data.columns else [None] * len(data)
+        for day, sentiment, label, key in zip(data['day'],
+                                              pd.to_numeric(data['default_sentiment'], errors='coerce'),
+                                              data['text sentiment'], keys):
+            if day < cutoff:
+                continue
+            series.add(day, None if pd.isna(sentiment) else float(sentiment), label,
+                       None if pd.isna(key) else key)
+        found = series.close_until(today.isoformat())
+        if self.on_anomaly is not None:
+            for anomaly in found:
+                self.on_anomaly(topic, anomaly)
+        return found
+
+    def sync(self, topic, data, csv_path, today=None):
+        """Fold newly saved rows into the state, replaying the CSV for a new topic.
+
+        Args:
+            topic (str): Topic the rows belong to.
+            data (pd.DataFrame): The new rows, already written to `csv_path`.
+            csv_path (str): The topic's full results CSV.
+            today (date): Current day, every day before it is closed.
+
+        Returns:
+            list: Anomalies detected on the days that were closed.
+        """
+        if topic not in self.topics and os.path.exists(csv_path):
+            return self.rebuild(topic, csv_path, today)
+        return self.update(topic, data, today)
+
+    def rebuild(self, topic, csv_path, today=None):
+        """Replay a topic's full results CSV into a fresh state."""
+        self.topics.pop(topic, None)
+        return self.update(topic, pd.read_csv(csv_path), today)
+
+    def daily_summary(self, topic, days):
+        return self.topics[topic].daily_summary(days)
+
+    def anomalies(self, topic=None, since=None):
+        """Return recorded anomalies, optionally for one topic and after a date.
+
+        Args:
+            topic (str): Restrict to this topic; all topics when None.
+            since (str): ISO date; only anomalies strictly after it are returned.
+
+        Returns:
+            list: Anomaly dicts with an added 'topic' key, oldest first.
+        """
+        topics = [topic] if topic is not None else list(self.topics)
+        result = []
+        for name in topics:
+            if name not in self.topics:
+                continue
+            for anomaly in self.topics[name].anomalies:
+                if since is None or anomaly['date'] > since:
+                    result.append(dict(anomaly, topic=name))
+        return sorted(result, key=lambda a: a['date'])
+
+    def save(self, topics=None):
+        """Write the state to disk.
+
+        Args:
+            topics (list): Only replace these topics in the file on disk, keeping
+            whatever other processes saved meanwhile; all topics when None.
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            state = {}
+            if topics is not None and os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    state = json.load(f)
+            for topic in (self.topics if topics is None else topics):
+                state[topic] = self.topics[topic].to_dict()
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+
+
+if __name__ == '__main__':
+    # Rebuild the state from the full results/ history
+    engine = SentimentTimeSeries()
+    with open('topics.txt', 'r') as f:
+        topics = [line.strip() for line in f if line.strip()]
+    for topic in topics:
+        csv_path = f'results/{topic}.csv'
+        if not os.path.exists(csv_path):
+            print('No results found for', topic)
+            continue
+        found = engine.rebuild(topic, csv_path)
+        print(f'{topic}: {len(found)} anomalies')
+    engine.save()
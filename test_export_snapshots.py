@@ -0,0 +1,95 @@
+import os
+import json
+import pandas as pd
+import pytest
+from datetime import date, timedelta
+import export_snapshots
+from dashboard_views import build_view
+from export_snapshots import export_view, init_worker, load_snapshot, render_page, snapshot_path
+from sentiment_timeseries import SentimentTimeSeries
+
+
+def day(offset):
+    return (date.today() - timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def results(tmp_path, monkeypatch):
+    """A working directory with a small results CSV and bullets.csv."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('results')
+    dates = [day(1), day(1), day(3), day(20)]
+    pd.DataFrame({'title': ['a', 'b', 'c', 'd'],
+                  'publish_date': dates,
+                  'published date': dates,
+                  'default_sentiment': [0.5, 0.1, -0.4, 0.2],
+                  'text sentiment': ['Positive', 'Neutral', 'Negative', 'Positive'],
+                  'summaries': ['one', 'two', 'three', 'four'],
+                  'url': ['u1', 'u2', 'u3', 'u4']}).to_csv('results/A.csv', index=False)
+    pd.DataFrame({'topic': ['A'], 'timeframe': ['Weekly'],
+                  'positive': ['- Good <x> news\n- More'],
+                  'negative': ['- Bad news']}).to_csv('results/bullets.csv', index=False)
+    return tmp_path
+
+
+def export(topic='A', timeframe='Week'):
+    init_worker()
+    export_view(topic, timeframe, include_plotlyjs=False)
+
+
+def test_export_view_writes_snapshots_atomically(results):
+    export()
+    files = os.listdir(os.path.join(export_snapshots.SNAPSHOT_DIR, 'A'))
+    assert sorted(files) == ['Week.html', 'Week.json']
+    view = load_snapshot('A', 'Week')
+    assert view['articles_in_period'] == 3
+    assert view['positive'] == ['Good <x> news', 'More']
+
+
+def test_snapshot_of_another_day_is_stale(results):
+    export()
+    path = snapshot_path('A', 'Week', 'json')
+    with open(path) as f:
+        view = json.load(f)
+    view['generated_on'] = day(1)
+    with open(path, 'w') as f:
+        json.dump(view, f)
+    assert load_snapshot('A', 'Week') is None
+
+
+@pytest.mark.parametrize('source', ['results/A.csv', 'results/bullets.csv'])
+def test_snapshot_is_stale_after_data_changes(results, source):
+    export()
+    mtime = os.path.getmtime(source)
+    os.utime(source, (mtime + 10, mtime + 10))
+    assert load_snapshot('A', 'Week') is None
+
+
+def test_data_changed_while_loading_marks_snapshot_stale(results):
+    init_worker()
+    mtime = os.path.getmtime('results/bullets.csv')
+    os.utime('results/bullets.csv', (mtime + 10, mtime + 10))
+    export_view('A', 'Week', include_plotlyjs=False)
+    assert load_snapshot('A', 'Week') is None
+
+
+def test_render_page_escapes_text(results):
+    view = build_view('A', 'Week', pd.read_csv('results/bullets.csv'))
+    page = render_page(view, include_plotlyjs=False)
+    assert '&lt;x&gt;' in page
+    assert '<x>' not in page
+
+
+def test_build_view_without_state_reads_csv(results):
+    view = build_view('A', 'Week', pd.read_csv('results/bullets.csv'))
+    assert view['articles_in_period'] == 3
+    assert sum(view['daily']['count_per_day']) == 3
+    assert view['anomalies'] == []
+
+
+def test_build_view_with_state_skips_csv(results):
+    timeseries = SentimentTimeSeries('results/timeseries_state.json')
+    timeseries.update('A', pd.read_csv('results/A.csv'))
+    os.remove('results/A.csv')
+    view = build_view('A', 'Week', pd.read_csv('results/bullets.csv'), timeseries)
+    assert view['articles_in_period'] == sum(view['daily']['count_per_day']) == 3
@@ -0,0 +1,119 @@
+import time
+import pytest
+from job_queue import JobQueue
+
+
+def make_queue(tmp_path, **kwargs):
+    kwargs.setdefault('retry_delay', 0)
+    return JobQueue(str(tmp_path / 'jobs.sqlite'), **kwargs)
+
+
+def finish(queue, job, worker_id='w'):
+    queue.complete(job['id'], worker_id)
+
+
+def test_stages_run_in_order(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue_run(['A'], run_id='r')
+    for stage in ('download', 'model', 'report'):
+        job = queue.claim('w', 'r')
+        assert job['stage'] == stage
+        assert queue.claim('w2', 'r') is None
+        finish(queue, job)
+    assert queue.is_finished('r')
+    assert queue.run_status('r') == {'done': 3}
+
+
+def test_claim_is_limited_to_one_run(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue_run(['A'], run_id='old')
+    queue.enqueue_run(['B'], run_id='new')
+    assert queue.claim('w', 'new')['topic'] == 'B'
+
+
+def test_topic_is_not_leased_twice_across_runs(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue_run(['A'], run_id='r1')
+    queue.enqueue_run(['A'], run_id='r2')
+    job = queue.claim('w1', 'r1')
+    assert queue.claim('w2', 'r2') is None
+    finish(queue, job, 'w1')
+    assert queue.claim('w2', 'r2')['run_id'] == 'r2'
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.1)
+    queue.enqueue_run(['A'], run_id='r')
+    first = queue.claim('w1', 'r')
+    time.sleep(0.2)
+    second = queue.claim('w2', 'r')
+    assert second['id'] == first['id']
+    assert second['attempts'] == 2
+    # The first worker lost the lease and can no longer renew or finish it
+    assert not queue.heartbeat(first['id'], 'w1')
+    finish(queue, first, 'w1')
+    assert queue.run_status('r') == {'leased': 1, 'pending': 2}
+
+
+def test_expired_lease_fails_after_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, lease_seconds=0.1, max_attempts=1)
+    queue.enqueue_run(['A'], run_id='r')
+    queue.claim('w', 'r')
+    time.sleep(0.2)
+    assert queue.claim('w', 'r') is None
+    assert queue.run_status('r') == {'failed': 1, 'pending': 2}
+    assert queue.is_finished('r')
+
+
+def test_fail_retries_with_backoff_then_gives_up(tmp_path):
+    queue = make_queue(tmp_path, max_attempts=2, retry_delay=0.2)
+    queue.enqueue_run(['A'], run_id='r')
+    job = queue.claim('w', 'r')
+    queue.fail(job['id'], 'w', 'boom')
+    assert queue.claim('w', 'r') is None
+    time.sleep(0.25)
+    job = queue.claim('w', 'r')
+    assert job['attempts'] == 2
+    queue.fail(job['id'], 'w', 'boom')
+    assert queue.run_status('r')['failed'] == 1
+    assert queue.is_finished('r')
+
+
+def test_topics_advance_breadth_first(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.enqueue_run(['A', 'B', 'C'], run_id='r')
+    order = []
+    while True:
+        job = queue.claim('w', 'r')
+        if job is None:
+            break
+        order.append((job['topic'], job['stage']))
+        finish(queue, job)
+    assert order[:4] == [('A', 'download'), ('B', 'download'), ('C', 'download'), ('A', 'model')]
+    assert order[-1] == ('C', 'report')
+
+
+def test_stage_caps_are_shared_by_every_worker(tmp_path):
+    make_queue(tmp_path).enqueue_run(['A', 'B'], run_id='r', stage_caps={'download': 1})
+    # A second process opening the store enforces the run's caps
+    first, second = make_queue(tmp_path), make_queue(tmp_path)
+    job = first.claim('w1', 'r')
+    assert second.claim('w2', 'r', stages=['download']) is None
+    finish(first, job, 'w1')
+    assert second.claim('w2', 'r', stages=['download'])['topic'] == 'B'
+
+
+def test_unknown_run_is_an_error(tmp_path):
+    queue = make_queue(tmp_path)
+    with pytest.raises(ValueError):
+        queue.is_finished('missing')
+
+
+def test_queue_must_live_in_the_working_directory(tmp_path, monkeypatch):
+    from worker import check_shared_workdir
+    workdir = tmp_path / 'work'
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    check_shared_workdir('intermediate/jobs.sqlite')
+    with pytest.raises(ValueError):
+        check_shared_workdir(str(tmp_path / 'elsewhere' / 'jobs.sqlite'))
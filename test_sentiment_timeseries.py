@@ -0,0 +1,92 @@
+import pandas as pd
+from datetime import date, timedelta
+from sentiment_timeseries import SentimentTimeSeries, TopicSeries
+
+TODAY = date(2026, 10, 20)
+
+
+def rows(day, count, label='Positive', sentiment=0.2, prefix=None):
+    prefix = prefix or f'{day}-{label}'
+    return pd.DataFrame({'publish_date': [day] * count,
+                         'default_sentiment': [sentiment] * count,
+                         'text sentiment': [label] * count,
+                         'summaries': ['summary'] * count,
+                         'url': [f'{prefix}-{i}' for i in range(count)]})
+
+
+def quiet_history(days=20, per_day=3):
+    start = TODAY - timedelta(days=days)
+    return pd.concat([rows((start + timedelta(days=i)).isoformat(), per_day)
+                      for i in range(days)], ignore_index=True)
+
+
+def test_late_rows_are_added_to_closed_days(tmp_path):
+    engine = SentimentTimeSeries(str(tmp_path / 'state.json'))
+    engine.update('A', pd.concat([rows('2026-10-01', 1), rows('2026-10-03', 1)]), today=date(2026, 10, 4))
+    engine.update('A', pd.concat([rows('2026-10-02', 1), rows('2026-10-04', 1)]), today=date(2026, 10, 5))
+    summary = engine.topics['A'].daily_summary(4, end_date=date(2026, 10, 4))
+    assert list(summary['count_per_day']) == [1, 1, 1, 1]
+
+
+def test_days_before_today_are_closed_without_newer_articles(tmp_path):
+    engine = SentimentTimeSeries(str(tmp_path / 'state.json'))
+    engine.update('A', quiet_history(), today=TODAY - timedelta(days=1))
+    spike = rows((TODAY - timedelta(days=1)).isoformat(), 30, label='Negative', sentiment=-0.8)
+    found = engine.update('A', spike, today=TODAY)
+    kinds = {anomaly['kind'] for anomaly in found}
+    assert {'volume_spike', 'negative_share_jump', 'sentiment_drop'} <= kinds
+    assert engine.topics['A'].last_closed == (TODAY - timedelta(days=1)).isoformat()
+
+
+def test_quiet_history_has_no_anomalies(tmp_path):
+    engine = SentimentTimeSeries(str(tmp_path / 'state.json'))
+    assert engine.update('A', quiet_history(), today=TODAY) == []
+
+
+def test_unparseable_dates_are_skipped(tmp_path):
+    engine = SentimentTimeSeries(str(tmp_path / 'state.json'))
+    data = rows('2026-10-19', 2)
+    data.loc[0, 'publish_date'] = None
+    engine.update('A', data, today=TODAY)
+    assert engine.topics['A'].total_count == 1
+
+
+def test_duplicate_rows_are_counted_once(tmp_path):
+    engine = SentimentTimeSeries(str(tmp_path / 'state.json'))
+    engine.update('A', rows('2026-10-19', 3), today=TODAY)
+    engine.update('A', rows('2026-10-19', 3), today=TODAY)
+    assert engine.topics['A'].days['2026-10-19']['count'] == 3
+
+
+def test_sync_replays_the_csv_for_a_new_topic(tmp_path):
+    csv_path = tmp_path / 'A.csv'
+    history = quiet_history()
+    history.to_csv(csv_path, index=False)
+    engine = SentimentTimeSeries(str(tmp_path / 'state.json'))
+    engine.sync('A', history.tail(3), str(csv_path), today=TODAY)
+    assert engine.topics['A'].total_count == len(history)
+    new_rows = rows('2026-10-20', 2)
+    engine.sync('A', new_rows, str(csv_path), today=TODAY)
+    assert engine.topics['A'].total_count == len(history) + 2
+
+
+def test_save_single_topic_keeps_other_topics(tmp_path):
+    path = str(tmp_path / 'state.json')
+    first = SentimentTimeSeries(path)
+    second = SentimentTimeSeries(path)
+    first.update('A', rows('2026-10-19', 1), today=TODAY)
+    second.update('B', rows('2026-10-19', 2), today=TODAY)
+    first.save(topics=['A'])
+    second.save(topics=['B'])
+    reloaded = SentimentTimeSeries(path)
+    assert reloaded.topics['A'].total_count == 1
+    assert reloaded.topics['B'].total_count == 2
+
+
+def test_old_buckets_are_pruned():
+    series = TopicSeries(window=10)
+    series.add('2026-09-01', 0.1, 'Positive', key='old')
+    series.add('2026-10-19', 0.1, 'Positive', key='new')
+    series.close_until('2026-10-20')
+    assert list(series.days) == ['2026-10-19']
+    assert list(series.seen) == ['new']
@@ -1,11 +1,13 @@
+import os
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from PIL import Image
 from datetime import datetime, timedelta, date
-import plotly.graph_objects as go
 import io
 import requests
+from sentiment_timeseries import SentimentTimeSeries
+from dashboard_views import build_view, build_figures, image_paths, default_image_path
+from export_snapshots import load_snapshot
 
 # Set page configuration
 st.set_page_config(layout="wide", page_title="Analysis Dashboard")
@@ -26,39 +28,13 @@ topics_dict = {
 
 bulletpoints = pd.read_csv(f'{dataset_path}bullets.csv')
 
-# Function to load and sort data
-def load_data(topic_name):
-    df = pd.read_csv(dataset_path + topics_dict[topic_name])
-    df = df.sort_values(by='publish_date', ascending=False)
-    df = df[df['summaries'] != 'Not-related content']
-    df = df[df['summaries'] != 'Not-related content.']
-    df['publish_date'] = pd.to_datetime(df['publish_date'])
-    return df
-
-
-def load_aggregated_data(topic_name, days):
-    '''df = pd.read_csv(dataset_path + topics_dict[topic_name])
-    df['publish_date'] = pd.to_datetime(df['publish_date']).dt.date'''
-    df = load_data(topic_name)
-
-    # Aggregate data by day
-    daily_summary = df.groupby('publish_date').agg({
-        'default_sentiment': 'mean',  # Average sentiment per day
-        'title': 'count'  # Count of entries per day, assuming 'title' as a proxy for entries
-    }).rename(columns={'default_sentiment': 'average_sentiment', 'title': 'count_per_day'})
-
-    # Create a date range for the last 'days' days, normalized to dates
-    end_date = pd.to_datetime("today").normalize()
-    start_date = end_date - pd.Timedelta(days=days - 1)
-    date_range = pd.date_range(start=start_date, end=end_date, freq='D').date
-
-    # Reindex the DataFrame to include all days in the last 'days' days, filling missing days with NaN
-    full_summary = daily_summary.reindex(date_range).fillna({
-        'average_sentiment': 0,  # Fill missing sentiment averages with 0
-        'count_per_day': 0       # Fill missing counts with 0
-    })
-
-    return full_summary
+# Rolling statistics maintained by model.py, avoids rescanning the CSVs.
+# Only parsed again when the state file changes.
+@st.cache_resource
+def load_timeseries(mtime):
+    return SentimentTimeSeries(f'{dataset_path}timeseries_state.json')
+
+
 st.markdown("<h1 style='text-align: center; color: #005A8D;'>Member Analysis</h1>", unsafe_allow_html=True)
 
 # Tab names
@@ -79,138 +55,48 @@ if selected_tab=='Analysis':
 
     st.markdown("---", unsafe_allow_html=True)  # Horizontal line
 
-    col1, col2, col3 = st.columns(3)
+    # Pre-rendered by export_snapshots.py, computed live when missing or stale
+    view = load_snapshot(selected_topic, selected_time_period)
+    if view is None:
+        state_path = f'{dataset_path}timeseries_state.json'
+        timeseries = load_timeseries(os.path.getmtime(state_path) if os.path.exists(state_path) else None)
+        view = build_view(selected_topic, selected_time_period, bulletpoints, timeseries)
+    article_count_plot, sentiment_plot, fig = build_figures(view)
 
-    filtered_data = load_aggregated_data(selected_topic, days)
+    # Flag sudden swings detected by the time-series engine
+    for anomaly in view['anomalies']:
+        st.warning(f"{anomaly['kind'].replace('_', ' ').capitalize()} on {anomaly['date']}: "
+                   f"{anomaly['value']} vs baseline {anomaly['baseline']}")
 
-    data = pd.read_csv(f'results/{selected_topic}.csv')
-    data = data[data['summaries'] != 'Not-related content.']
-    data = data[data['summaries'] != 'Not-related content']
-
-    data['publish_date'] = pd.to_datetime(data['published date']).dt.date
-    # Sort data by publish_date
-    data.sort_values('publish_date', ascending=False, inplace=True)
-    today = date.today()
-    date = today - timedelta(days=days)
-    selected_data = data[(data['publish_date'] > date)]
+    col1, col2, col3 = st.columns(3)
 
     # First section: Number of articles over time and displaying bullet points for positive sentences
     with col1:
         # Plotting the number of articles
-        article_count_plot = px.line(filtered_data, y='count_per_day', labels={'index': 'Date', 'count_per_day': 'Article Count'},
-                                        title=f'Number of Articles per {selected_time_period}')
-        article_count_plot.update_layout(xaxis_title='Date', yaxis_title='Number of Articles', plot_bgcolor='#F4F6F9', paper_bgcolor='#F4F6F9')
-        article_count_plot.update_layout(title={'x':0.5, 'xanchor': 'center'})
         st.plotly_chart(article_count_plot, use_container_width=True)
 
         # Display bullet points for positive news
-        topic_bullets = bulletpoints[(bulletpoints['topic'] == selected_topic) & (bulletpoints['timeframe'] == f'{selected_time_period}ly')]
-        #print(topic_bullets)
-        positive_sentences = [sentence.strip('- ').strip() for sentence in topic_bullets['positive'].iloc[0].split('\n') if sentence]
         st.subheader('Positive News')
         st.markdown("<ul style='list-style-type: disc; padding-left: 20px; text-align: center;'>", unsafe_allow_html=True)
-        for sentence in positive_sentences:
+        for sentence in view['positive']:
             st.markdown(f"<li style='color: #006E8D;'>{sentence}</li>", unsafe_allow_html=True)
         st.markdown("</ul>", unsafe_allow_html=True)
 
     # Second section: Sentiment over time and displaying bullet points for negative sentences
     with col2:
         # Plotting sentiment over time
-        sentiment_plot = px.line(filtered_data, y='average_sentiment', labels={'index': 'Date', 'average_sentiment': 'Average Sentiment'},
-                                    title=f'Sentiment over {selected_time_period}')
-        sentiment_plot.update_layout(xaxis_title='Date', yaxis_title='Sentiment Score', plot_bgcolor='#F4F6F9', paper_bgcolor='#F4F6F9')
-        sentiment_plot.update_layout(title={'x':0.5, 'xanchor': 'center'})
-        sentiment_plot.update_traces(line_color='#FF5733')
         st.plotly_chart(sentiment_plot, use_container_width=True)
 
         # Display bullet points for negative news
-        try:
-            negative_sentences = [sentence.strip('- ').strip() for sentence in topic_bullets['negative'].iloc[0].split('\n') if sentence]
-        except:
-            negative_sentences = ['']
         st.subheader('Negative News')
         st.markdown("<ul style='list-style-type: disc; padding_left: 20px; text-align: center;'>", unsafe_allow_html=True)
-        for sentence in negative_sentences:
+        for sentence in view['negative']:
             st.markdown(f"<li style='color: #FF5733;'>{sentence}</li>", unsafe_allow_html=True)
         st.markdown("</ul>", unsafe_allow_html=True)
 
-    # Optionally, you can add additional visualizations or data summaries in col3 or elsewhere as needed
-
-
-
-    # Third section: Image, today's sentiment, number of articles today
-    articles_in_time = filtered_data['count_per_day'].sum()
-
-    # Third section: Image, today's sentiment, number of articles today
-    articles_in_time = filtered_data['count_per_day'].sum()
-
+    # Third section: Image, average sentiment, number of articles in the timeframe
     with col3:
-        # Calculate the average sentiment
-        average_sentiment = filtered_data['average_sentiment'].mean() * 100
-
-        # Determine sentiment text
-        sentiment_text = ""
-        if -10 <= average_sentiment <= 10:
-            sentiment_text = "Neutral"
-        elif -30 <= average_sentiment < -10:
-            sentiment_text = "Slightly Negative"
-        elif -60 <= average_sentiment < -30:
-            sentiment_text = "Moderately Negative"
-        elif average_sentiment < -60:
-            sentiment_text = "Very Negative"
-        elif 10 < average_sentiment <= 30:
-            sentiment_text = "Slightly Positive"
-        elif 30 < average_sentiment <= 60:
-            sentiment_text = "Moderately Positive"
-        elif average_sentiment > 60:
-            sentiment_text = "Very Positive"
-
-        # Convert average sentiment to percentage and add percentage sign
-        average_sentiment_percentage = f"{average_sentiment:.2f}%"
-
-        fig = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=average_sentiment,
-            domain={'x': [0, 1], 'y': [0, 1]},
-            title={'text': "Average Sentiment"},
-            gauge={
-                'axis': {'range': [-100, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
-                'bar': {'color': 'rgb(128, 122, 0)', 'thickness': 0.75},
-                'bgcolor': "#F4F6F9",
-                'borderwidth': 2,
-                'bordercolor': "gray",
-                'steps': [
-                    {'range': [-100, -50], 'color': 'rgb(255, 0, 0)'},
-                    {'range': [-50, 50], 'color': 'rgb(255, 255, 255)'},
-                    {'range': [50, 100], 'color': 'rgb(60, 255, 0)'}
-                ],
-            }
-        ))
-
-        # Add percentage sign and sentiment text
-        fig.update_layout(
-            annotations=[
-                dict(
-                    text=f"{sentiment_text}",
-                    x=0.5,
-                    y=0.5,
-                    font=dict(size=24),
-                    showarrow=False,
-                    align="center"
-                )
-            ]
-        )
-
-        fig.update_layout(plot_bgcolor="#F0F2F6")  # Set background color for the graph
-        fig.update_layout(paper_bgcolor="#F0F2F6")  # Set background color for the plot area
-
-        # Define image_path with a default image
-        default_image_path = 'logos/Default-Logo.png'  # Adjust to a valid default image path
-        image_path = {
-            'Federal Home Loan Bank of San Francisco': 'logos/Federal-Home-Loan-Bank-Logo.png',
-            'Fannie Mae': 'logos/Fannie-Mae-Logo.png',
-            'First Republic Bank': 'logos/First-Republic-Bank-Logo.png',
-        }.get(selected_topic, default_image_path)
+        image_path = image_paths.get(selected_topic, default_image_path)
 
         try:
             image = Image.open(image_path)
@@ -218,7 +104,7 @@ if selected_tab=='Analysis':
         except Exception as e:
             st.error(f"Error loading image: {e}")
 
-        st.markdown(f'<p style="color: #005A8D; font-size: 18px; text-align: center ; " > Number of news articles released this {selected_time_period}: {len(selected_data)} </p>', unsafe_allow_html=True)
+        st.markdown(f'<p style="color: #005A8D; font-size: 18px; text-align: center ; " > Number of news articles released this {selected_time_period}: {view["articles_in_period"]} </p>', unsafe_allow_html=True)
         st.plotly_chart(fig, use_container_width=True)
 
 elif selected_tab=='News Summaries':
@@ -277,13 +163,7 @@ elif selected_tab=='News Summaries':
 
     with col3:
         
-        # Define image_path with a default image
-        default_image_path = 'logos/Default-Logo.png'  # Adjust to a valid default image path
-        image_path = {
-            'Federal Home Loan Bank of San Francisco': 'logos/Federal-Home-Loan-Bank-Logo.png',
-            'Fannie Mae': 'logos/Fannie-Mae-Logo.png',
-            'First Republic Bank': 'logos/First-Republic-Bank-Logo.png',
-        }.get(selected_topic, default_image_path)
+        image_path = image_paths.get(selected_topic, default_image_path)
 
         try:
             image = Image.open(image_path)
@@ -0,0 +1,204 @@
+import os
+import time
+import pickle
+import socket
+import argparse
+import threading
+import traceback
+import multiprocessing
+import pandas as pd
+from job_queue import JobQueue, STAGES
+
+BULLETS_DIR = 'results/bullets'
+
+# Per-process cache of the models and few-shot examples
+_context = {}
+
+
+def get_llm(top_p):
+    """Create the Gemini chat model once per worker process."""
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    if top_p not in _context:
+        with open('gemini_api_key.pickle', 'rb') as handle:
+            gemini_api_key = pickle.load(handle)
+        _context[top_p] = (ChatGoogleGenerativeAI(model="gemini-pro",
+                                                  google_api_key=gemini_api_key,
+                                                  temperature=0, top_p=top_p),
+                           StrOutputParser())
+    return _context[top_p]
+
+
+def run_download(topic):
+    import download_news
+    download_news.process_topic(topic)
+
+
+def run_model(topic):
+    import model
+    from sentiment_timeseries import SentimentTimeSeries
+    llm, output_parser = get_llm(top_p=1)
+    if 'examples' not in _context:
+        data = pd.read_csv('few_shots_sentiments.csv')
+        _context['examples'] = [{'question':row['content'], 'answer':row['label']} for index, row in data.iterrows()]
+    # Fresh state per job, other workers save their own topics meanwhile
+    timeseries = SentimentTimeSeries(on_anomaly=lambda topic, anomaly: print('Anomaly detected for', topic, anomaly))
+    if not model.process_topic(topic, llm, output_parser, _context['examples'], timeseries):
+        # An earlier attempt finished but died before the job was marked done
+        if os.path.exists(f'intermediate/processed/{topic}.csv'):
+            print(f'{topic} was already processed')
+            return
+        raise FileNotFoundError(f'No staged data found for {topic}')
+
+
+def run_report(topic):
+    import report_generation
+    llm, output_parser = get_llm(top_p=0.1)
+    rows = report_generation.generate_bullets(topic, llm, output_parser,
+                                              report_generation.get_date_filters())
+    os.makedirs(BULLETS_DIR, exist_ok=True)
+    pd.DataFrame(rows, columns=['topic','timeframe','positive','negative']).to_csv(
+        f'{BULLETS_DIR}/{topic}.csv', index=False)
+
+
+STAGE_HANDLERS = {'download': run_download, 'model': run_model, 'report': run_report}
+
+
+def merge_bullets(topics):
+    """Combine the per-topic bullets into results/bullets.csv for the dashboard.
+
+    Args:
+        topics (list): Topics whose report job finished in this run. Other
+        topics keep their rows from the previous results/bullets.csv.
+    """
+    frames = [pd.read_csv(f'{BULLETS_DIR}/{topic}.csv') for topic in topics]
+    if os.path.exists('results/bullets.csv'):
+        previous = pd.read_csv('results/bullets.csv')
+        previous = previous[~previous['topic'].isin(topics)]
+        if len(previous):
+            print('Keeping earlier bullets for', ', '.join(previous['topic'].unique()))
+        frames.append(previous)
+    if frames:
+        # Replace the file atomically, the dashboard may be reading it
+        pd.concat(frames, ignore_index=True).to_csv('results/bullets.csv.tmp', index=False)
+        os.replace('results/bullets.csv.tmp', 'results/bullets.csv')
+
+
+def run_job(queue, job, worker_id):
+    """Run a claimed job while a background thread keeps its lease alive."""
+    stop = threading.Event()
+
+    def keep_alive():
+        while not stop.wait(queue.lease_seconds / 3):
+            if not queue.heartbeat(job['id'], worker_id):
+                print(f'{worker_id} lost the lease on {job["topic"]} / {job["stage"]}')
+                return
+
+    heartbeat = threading.Thread(target=keep_alive, daemon=True)
+    heartbeat.start()
+    try:
+        STAGE_HANDLERS[job['stage']](job['topic'])
+    except Exception:
+        queue.fail(job['id'], worker_id, traceback.format_exc())
+        print(f'{worker_id} failed {job["topic"]} / {job["stage"]} (attempt {job["attempts"]})')
+    else:
+        queue.complete(job['id'], worker_id)
+        print(f'{worker_id} finished {job["topic"]} / {job["stage"]}')
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def work(worker_id, run_id, queue_kwargs, stages=None, poll_interval=5):
+    """Claim and run jobs until every job of the run is done or failed."""
+    queue = JobQueue(**queue_kwargs)
+    while True:
+        job = queue.claim(worker_id, run_id, stages)
+        if job is not None:
+            run_job(queue, job, worker_id)
+        elif queue.is_finished(run_id):
+            return
+        else:
+            time.sleep(poll_interval)
+
+
+def check_shared_workdir(queue_path):
+    """Refuse to work unless the queue lives inside the working directory.
+
+    Stages hand data to each other through intermediate/, news/ and
+    results/ relative to the working directory, so every host must run from
+    the same shared directory that also holds the queue.
+    """
+    workdir = os.path.realpath(os.getcwd())
+    queue_path = os.path.realpath(queue_path)
+    if os.path.commonpath([workdir, queue_path]) != workdir:
+        raise ValueError(f'The queue {queue_path} must live inside the working directory {workdir}, '
+                         'which has to be shared by every host of the run')
+
+
+def parse_caps(caps):
+    """Parse ['model=2', 'report=1'] into {'model': 2, 'report': 1}."""
+    result = {}
+    for cap in caps or []:
+        stage, limit = cap.split('=')
+        if stage not in STAGES:
+            raise ValueError(f'Unknown stage {stage}, expected one of {STAGES}')
+        result[stage] = int(limit)
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run the news pipeline as a sharded job queue.',
+        epilog='Hosts sharing a run must run from the same shared directory holding the queue, '
+               'on a filesystem with working POSIX locks (not plain NFS).')
+    parser.add_argument('command', choices=['enqueue', 'work', 'status'])
+    parser.add_argument('--run-id', help='Run to enqueue (defaults to today) or to work on / report (required)')
+    parser.add_argument('--queue', default='intermediate/jobs.sqlite', help='Path to the shared queue database')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--cap', action='append', help='Per-stage concurrency cap stored with the enqueued run, e.g. model=2')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, help='Only run these stages on this host')
+    parser.add_argument('--lease-seconds', type=int, default=600)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    args = parser.parse_args()
+    if args.run_id is None:
+        if args.command != 'enqueue':
+            parser.error(f'--run-id is required for {args.command}')
+        args.run_id = time.strftime('%Y-%m-%d')
+    if args.command == 'work':
+        try:
+            check_shared_workdir(args.queue)
+        except ValueError as e:
+            parser.error(str(e))
+
+    with open('topics.txt', 'r') as f:
+        topics = [line.strip() for line in f if line.strip()]
+    queue_kwargs = {'path': args.queue, 'lease_seconds': args.lease_seconds,
+                    'max_attempts': args.max_attempts}
+    queue = JobQueue(**queue_kwargs)
+
+    if args.command == 'enqueue':
+        queue.enqueue_run(topics, run_id=args.run_id, stage_caps=parse_caps(args.cap))
+        print(f'Enqueued {len(topics)} topics for run {args.run_id}')
+    elif args.command == 'work':
+        try:
+            queue.is_finished(args.run_id)
+        except ValueError as e:
+            parser.error(str(e))
+        host = socket.gethostname()
+        processes = [multiprocessing.Process(target=work,
+                                             args=(f'{host}-{os.getpid()}-{i}', args.run_id,
+                                                   queue_kwargs, args.stages))
+                     for i in range(args.workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        # Only hosts running the report stage own the merged bullets
+        if args.stages is None or 'report' in args.stages:
+            merge_bullets(queue.topics_in_state(args.run_id, 'report'))
+            import export_snapshots
+            export_snapshots.export_all(workers=args.workers)
+        print(f'Run {args.run_id} finished:', queue.run_status(args.run_id))
+    else:
+        print(queue.run_status(args.run_id))